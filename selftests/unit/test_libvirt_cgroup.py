@@ -0,0 +1,182 @@
+#!/usr/bin/python
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+from avocado.core import exceptions
+
+# simple magic for using scripts within a source tree
+basedir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if os.path.isdir(os.path.join(basedir, "virttest")):
+    sys.path.append(basedir)
+
+from virttest import libvirt_cgroup
+
+# /proc/mounts content of a host with cgroup v1 only
+MOUNTS_V1 = """sysfs /sys sysfs rw,seclabel,nosuid,nodev,noexec,relatime 0 0
+tmpfs /sys/fs/cgroup tmpfs ro,seclabel,nosuid,nodev,noexec,mode=755 0 0
+cgroup /sys/fs/cgroup/systemd cgroup rw,seclabel,nosuid,nodev,noexec,relatime,xattr,name=systemd 0 0
+cgroup /sys/fs/cgroup/blkio cgroup rw,seclabel,nosuid,nodev,noexec,relatime,blkio 0 0
+cgroup /sys/fs/cgroup/memory cgroup rw,seclabel,nosuid,nodev,noexec,relatime,memory 0 0
+"""
+
+# /proc/mounts content of a host with the unified cgroup v2 hierarchy
+MOUNTS_V2 = """sysfs /sys sysfs rw,seclabel,nosuid,nodev,noexec,relatime 0 0
+cgroup2 /sys/fs/cgroup cgroup2 rw,seclabel,nosuid,nodev,noexec,relatime,nsdelegate 0 0
+/dev/vda1 / xfs rw,seclabel,relatime,attr2,inode64,noquota 0 0
+"""
+
+# /proc/mounts content of a hybrid host, with v1 controllers and cgroup2
+MOUNTS_HYBRID = """sysfs /sys sysfs rw,seclabel,nosuid,nodev,noexec,relatime 0 0
+tmpfs /sys/fs/cgroup tmpfs ro,seclabel,nosuid,nodev,noexec,mode=755 0 0
+cgroup2 /sys/fs/cgroup/unified cgroup2 rw,seclabel,nosuid,nodev,noexec,relatime,nsdelegate 0 0
+cgroup /sys/fs/cgroup/systemd cgroup rw,seclabel,nosuid,nodev,noexec,relatime,xattr,name=systemd 0 0
+cgroup /sys/fs/cgroup/blkio cgroup rw,seclabel,nosuid,nodev,noexec,relatime,blkio 0 0
+"""
+
+
+class CgroupMountsTest(unittest.TestCase):
+    def _load_mounts(self, cgtest, mounts):
+        with mock.patch("builtins.open", mock.mock_open(read_data=mounts)) as m:
+            result = cgtest._load_mounts()
+        return result, m
+
+    def test_load_mounts_v1(self):
+        cgtest = libvirt_cgroup.CgroupTest(1)
+        result, _ = self._load_mounts(cgtest, MOUNTS_V1)
+        self.assertEqual(result, (False, None))
+        self.assertFalse(cgtest.is_cgroup_v2_enabled())
+
+    def test_load_mounts_v2(self):
+        cgtest = libvirt_cgroup.CgroupTest(1)
+        result, _ = self._load_mounts(cgtest, MOUNTS_V2)
+        self.assertEqual(result, (True, "/sys/fs/cgroup"))
+        self.assertTrue(cgtest.is_cgroup_v2_enabled())
+
+    def test_load_mounts_hybrid(self):
+        cgtest = libvirt_cgroup.CgroupTest(1)
+        result, _ = self._load_mounts(cgtest, MOUNTS_HYBRID)
+        self.assertEqual(result, (True, "/sys/fs/cgroup/unified"))
+
+    def test_load_mounts_cached(self):
+        cgtest = libvirt_cgroup.CgroupTest(1)
+        self._load_mounts(cgtest, MOUNTS_V2)
+        result, m = self._load_mounts(cgtest, MOUNTS_V1)
+        self.assertEqual(result, (True, "/sys/fs/cgroup"))
+        m.assert_not_called()
+
+    def test_refresh_mounts(self):
+        cgtest = libvirt_cgroup.CgroupTest(1)
+        self._load_mounts(cgtest, MOUNTS_V2)
+        cgtest.refresh_mounts()
+        result, m = self._load_mounts(cgtest, MOUNTS_V1)
+        self.assertEqual(result, (False, None))
+        m.assert_called_once_with("/proc/mounts", "r")
+
+
+class CgroupCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cgtest = libvirt_cgroup.CgroupTest(1)
+        self.cgtest._mounts_cache = (False, None)
+        self.cgtest._cgroup_path_cache["blkio"] = "/sys/fs/cgroup/blkio/vm"
+        self.cgtest._is_bfq = True
+        self.cgtest._devnum_cache["/dev/sda"] = "8:0"
+
+    def test_get_cgroup_path_cached(self):
+        self.assertEqual(
+            self.cgtest.get_cgroup_path("blkio"), "/sys/fs/cgroup/blkio/vm"
+        )
+
+    def test_refresh_mounts_drops_paths(self):
+        self.cgtest.refresh_mounts()
+        self.assertIsNone(self.cgtest._mounts_cache)
+        self.assertEqual(self.cgtest._cgroup_path_cache, {})
+        self.assertTrue(self.cgtest._is_bfq)
+        self.assertEqual(self.cgtest._devnum_cache, {"/dev/sda": "8:0"})
+
+    def test_invalidate_cache(self):
+        self.cgtest.invalidate_cache()
+        self.assertIsNone(self.cgtest._mounts_cache)
+        self.assertEqual(self.cgtest._cgroup_path_cache, {})
+        self.assertIsNone(self.cgtest._is_bfq)
+        self.assertEqual(self.cgtest._devnum_cache, {})
+
+
+class CgroupFileMappingTest(unittest.TestCase):
+    def setUp(self):
+        self.cgtest = libvirt_cgroup.CgroupTest(1)
+        self.cgtest._mounts_cache = (False, None)
+        self.cgtest._cgroup_path_cache["blkio"] = "/sys/fs/cgroup/blkio/vm"
+        self.v1_blkio_mapping = dict(libvirt_cgroup.CGROUP_V1_BLKIO_FILE_MAPPING)
+
+    def tearDown(self):
+        self.assertEqual(
+            dict(libvirt_cgroup.CGROUP_V1_BLKIO_FILE_MAPPING), self.v1_blkio_mapping
+        )
+
+    @mock.patch.object(libvirt_cgroup.CgroupTest, "is_bfq", return_value=True)
+    def test_v1_blkio_mapping_bfq(self, _):
+        mapping = self.cgtest.get_cgroup_file_mapping("blkiotune")
+        self.assertEqual(mapping["weight"], "blkio.bfq.weight")
+        self.assertNotIn("weight_device", mapping)
+
+    @mock.patch.object(libvirt_cgroup.CgroupTest, "is_bfq", return_value=False)
+    def test_v1_blkio_mapping_cfq(self, _):
+        mapping = self.cgtest.get_cgroup_file_mapping("blkiotune")
+        self.assertEqual(mapping["weight"], "blkio.weight")
+        self.assertEqual(mapping["weight_device"], "blkio.weight_device")
+
+    @mock.patch.object(libvirt_cgroup, "_read_cgroup_file", return_value=b"8:0 100\n")
+    @mock.patch.object(libvirt_cgroup.CgroupTest, "is_bfq", return_value=False)
+    def test_v1_blkio_standardize_cfq(self, *_):
+        cg_info = self.cgtest.get_standardized_cgroup_info("blkiotune")
+        self.assertEqual(cg_info["8:0"]["weight_device"], "100")
+        self.assertNotIn("weight_device", libvirt_cgroup.CGROUP_V1_BLKIO_FILE_MAPPING)
+
+
+class CgroupFilePathTest(unittest.TestCase):
+    @mock.patch.object(libvirt_cgroup.CgroupTest, "get_cgroup_path", return_value=None)
+    def test_missing_cgroup_path(self, _):
+        cgtest = libvirt_cgroup.CgroupTest(1)
+        cgtest._mounts_cache = (False, None)
+        self.assertRaises(
+            exceptions.TestError, cgtest.get_standardized_cgroup_info, "memtune"
+        )
+
+    @mock.patch.object(libvirt_cgroup, "_read_cgroup_file", return_value=b"")
+    def test_v2_blkio_weight_path(self, read_mock):
+        cgtest = libvirt_cgroup.CgroupTest(1)
+        cgtest._mounts_cache = (True, "/sys/fs/cgroup")
+        cgtest._cgroup_path_cache[None] = (
+            "/sys/fs/cgroup/machine.slice/machine-qemu.scope/libvirt"
+        )
+        cgtest.get_standardized_cgroup_info("blkiotune")
+        read_mock.assert_any_call(
+            "/sys/fs/cgroup/machine.slice/machine-qemu.scope/io.bfq.weight"
+        )
+
+
+class ConvertVirshOutputTest(unittest.TestCase):
+    def test_convert_virsh_output_to_dict(self):
+        result = mock.Mock(stdout_text="""weight         : 500
+device_weight  :
+device_read_iops_sec: /dev/disk/by-path/pci-0000:00:1f.2,1000
+no colon line
+weight         : 800
+""")
+        output_dict = libvirt_cgroup.CgroupTest(1).convert_virsh_output_to_dict(result)
+        self.assertEqual(
+            output_dict,
+            {
+                "weight": "800",
+                "device_weight": "",
+                "device_read_iops_sec": "/dev/disk/by-path/pci-0000:00:1f.2,1000",
+                "no colon line": "",
+            },
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,69 +7,151 @@ Virtualization test - cgroup related utility functions for libvirt
 import logging
 import os
 import re
+import types
 
-from avocado.utils import process
+from avocado.core import exceptions
 
 from virttest import utils_disk, virsh
 from virttest.staging import utils_cgroup
 
-VIRSH_BLKIOTUNE_OUTPUT_MAPPING = {
-    "weight": "weight",
-    "device_read_iops_sec": "riops",
-    "device_write_iops_sec": "wiops",
-    "device_read_bytes_sec": "rbps",
-    "device_write_bytes_sec": "wbps",
+VIRSH_BLKIOTUNE_OUTPUT_MAPPING = types.MappingProxyType(
+    {
+        "weight": "weight",
+        "device_read_iops_sec": "riops",
+        "device_write_iops_sec": "wiops",
+        "device_read_bytes_sec": "rbps",
+        "device_write_bytes_sec": "wbps",
+    }
+)
+_CGROUP_V1_BLKIO_BFQ = types.MappingProxyType(
+    {
+        "weight": "blkio.bfq.weight",
+        "wiops": "blkio.throttle.write_iops_device",
+        "riops": "blkio.throttle.read_iops_device",
+        "rbps": "blkio.throttle.read_bps_device",
+        "wbps": "blkio.throttle.write_bps_device",
+    }
+)
+_CGROUP_V1_BLKIO_CFQ = types.MappingProxyType(
+    {
+        "weight": "blkio.weight",
+        "wiops": "blkio.throttle.write_iops_device",
+        "riops": "blkio.throttle.read_iops_device",
+        "rbps": "blkio.throttle.read_bps_device",
+        "wbps": "blkio.throttle.write_bps_device",
+        "weight_device": "blkio.weight_device",
+    }
+)
+CGROUP_V1_BLKIO_FILE_MAPPING = _CGROUP_V1_BLKIO_BFQ
+CGROUP_V2_BLKIO_FILE_MAPPING = types.MappingProxyType(
+    {
+        "weight": "io.bfq.weight",
+        "wiops": "io.max",
+        "riops": "io.max",
+        "rbps": "io.max",
+        "wbps": "io.max",
+    }
+)
+CGROUP_V1_MEM_FILE_MAPPING = types.MappingProxyType(
+    {
+        "hard_limit": "memory.limit_in_bytes",
+        "soft_limit": "memory.soft_limit_in_bytes",
+        "swap_hard_limit": "memory.memsw.limit_in_bytes",
+    }
+)
+CGROUP_V2_MEM_FILE_MAPPING = types.MappingProxyType(
+    {
+        "hard_limit": "memory.max",
+        "soft_limit": "memory.high",
+        "swap_hard_limit": "memory.swap.max",
+    }
+)
+CGROUP_V1_SCHEDINFO_FILE_MAPPING = types.MappingProxyType(
+    {
+        "cpu_shares": "cpu.shares",
+        "vcpu_period": "<vcpuX>/cpu.cfs_period_us",
+        "vcpu_quota": "<vcpuX>/cpu.cfs_quota_us",
+        "emulator_period": "emulator/cpu.cfs_period_us",
+        "emulator_quota": "emulator/cpu.cfs_quota_us",
+        "global_period": "cpu.cfs_period_us",
+        "global_quota": "cpu.cfs_quota_us",
+        "iothread_period": "<iothreadX>/cpu.cfs_period_us",
+        "iothread_quota": "<iothreadX>/cpu.cfs_quota_us",
+    }
+)
+CGROUP_V2_SCHEDINFO_FILE_MAPPING = types.MappingProxyType(
+    {
+        "cpu_shares": "cpu.weight",
+        "vcpu_period": "<vcpuX>/cpu.max",
+        "vcpu_quota": "<vcpuX>/cpu.max",
+        "emulator_period": "emulator/cpu.max",
+        "emulator_quota": "emulator/cpu.max",
+        "global_period": "cpu.max",
+        "global_quota": "cpu.max",
+        "iothread_period": "<iothreadX>/cpu.max",
+        "iothread_quota": "<iothreadX>/cpu.max",
+    }
+)
+
+# cgroup file mappings, indexed by is_cgroup_v2_enabled() and virsh cmd.
+# cgroup v1 blkiotune is not listed since it depends on the io scheduler
+_FILE_MAPPINGS = {
+    True: {
+        "memtune": CGROUP_V2_MEM_FILE_MAPPING,
+        "blkiotune": CGROUP_V2_BLKIO_FILE_MAPPING,
+        "schedinfo": CGROUP_V2_SCHEDINFO_FILE_MAPPING,
+    },
+    False: {
+        "memtune": CGROUP_V1_MEM_FILE_MAPPING,
+        "schedinfo": CGROUP_V1_SCHEDINFO_FILE_MAPPING,
+    },
 }
-CGROUP_V1_BLKIO_FILE_MAPPING = {
-    "weight": "blkio.bfq.weight",
-    "wiops": "blkio.throttle.write_iops_device",
-    "riops": "blkio.throttle.read_iops_device",
-    "rbps": "blkio.throttle.read_bps_device",
-    "wbps": "blkio.throttle.write_bps_device",
-}
-CGROUP_V2_BLKIO_FILE_MAPPING = {
-    "weight": "io.bfq.weight",
-    "wiops": "io.max",
-    "riops": "io.max",
-    "rbps": "io.max",
-    "wbps": "io.max",
-}
-CGROUP_V1_MEM_FILE_MAPPING = {
-    "hard_limit": "memory.limit_in_bytes",
-    "soft_limit": "memory.soft_limit_in_bytes",
-    "swap_hard_limit": "memory.memsw.limit_in_bytes",
-}
-CGROUP_V2_MEM_FILE_MAPPING = {
-    "hard_limit": "memory.max",
-    "soft_limit": "memory.high",
-    "swap_hard_limit": "memory.swap.max",
-}
-CGROUP_V1_SCHEDINFO_FILE_MAPPING = {
-    "cpu_shares": "cpu.shares",
-    "vcpu_period": "<vcpuX>/cpu.cfs_period_us",
-    "vcpu_quota": "<vcpuX>/cpu.cfs_quota_us",
-    "emulator_period": "emulator/cpu.cfs_period_us",
-    "emulator_quota": "emulator/cpu.cfs_quota_us",
-    "global_period": "cpu.cfs_period_us",
-    "global_quota": "cpu.cfs_quota_us",
-    "iothread_period": "<iothreadX>/cpu.cfs_period_us",
-    "iothread_quota": "<iothreadX>/cpu.cfs_quota_us",
-}
-CGROUP_V2_SCHEDINFO_FILE_MAPPING = {
-    "cpu_shares": "cpu.weight",
-    "vcpu_period": "<vcpuX>/cpu.max",
-    "vcpu_quota": "<vcpuX>/cpu.max",
-    "emulator_period": "emulator/cpu.max",
-    "emulator_quota": "emulator/cpu.max",
-    "global_period": "cpu.max",
-    "global_quota": "cpu.max",
-    "iothread_period": "<iothreadX>/cpu.max",
-    "iothread_quota": "<iothreadX>/cpu.max",
+
+_VIRSH_FUNCS = {
+    "memtune": virsh.memtune_list,
+    "blkiotune": virsh.blkiotune,
+    "schedinfo": virsh.schedinfo,
 }
 
+_CG_SCOPE_RE = re.compile(rb"\S*::(\S*)")
+_DIGITS_RE = re.compile(rb"\d+")
+
+# cfs quota values meaning 'max'/'unlimited'
+_MAX_QUOTA_VALUES = frozenset({"-1", "18446744073709551", "17592186044415"})
+_UNLIMITED_MEM = frozenset({"unlimited"})
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+if _PAGE_SIZE == 65536:
+    _MAX_MEM_VALUE = "9223372036854710272"
+else:
+    _MAX_MEM_VALUE = "9223372036854771712"
+
 LOG = logging.getLogger("avocado." + __name__)
 
 
+def _read_cgroup_file(path):
+    """
+    Read a cgroup control file with raw os-level reads
+
+    Cgroup control files are small, so this normally takes a single read
+    and avoids the buffered text layer of open()/readlines().
+
+    :param path: The path to the cgroup file
+    :return: The file content, as bytes
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        chunks = []
+        while True:
+            chunk = os.read(fd, 4096)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b"".join(chunks)
+    finally:
+        os.close(fd)
+
+
 # cgroup related functions
 class CgroupTest(object):
     """Class for libvirt cgroup related test"""
@@ -78,6 +160,43 @@ class CgroupTest(object):
 
     def __init__(self, vm_pid):
         self.__vm_pid = vm_pid
+        self._mounts_cache = None
+        self._cgroup_path_cache = {}
+        self._is_bfq = None
+        self._devnum_cache = {}
+        self._standardizers = {
+            True: self.__get_standardized_cgroup2_info,
+            False: self.__get_standardized_cgroup1_info,
+        }
+
+    def _load_mounts(self):
+        """
+        Parse /proc/mounts once and cache the cgroup related info
+
+        :return: A tuple (is_v2, cg_mount_point), where is_v2 is True when a
+                 cgroup2 filesystem is mounted and cg_mount_point is its mount
+                 point (None if cgroup v2 is not mounted)
+        """
+        if self._mounts_cache is None:
+            cg_mount_point = None
+            with open("/proc/mounts", "r") as mnts:
+                for line in mnts.read().splitlines():
+                    fields = line.split()
+                    if len(fields) > 2 and fields[2] == "cgroup2":
+                        cg_mount_point = fields[1]
+                        break
+            self._mounts_cache = (cg_mount_point is not None, cg_mount_point)
+        return self._mounts_cache
+
+    def refresh_mounts(self):
+        """
+        Drop the cached /proc/mounts info, e.g. after cgroups get remounted
+
+        The cached cgroup paths are dropped as well since they are derived
+        from the mount point.
+        """
+        self._mounts_cache = None
+        self._cgroup_path_cache.clear()
 
     def is_cgroup_v2_enabled(self):
         """
@@ -86,29 +205,56 @@ class CgroupTest(object):
         :return: True means cgroup v2 enabled
                  False means not
         """
-        cmd = "cat /proc/mounts | grep cgroup2"
-        cmd_result = process.run(cmd, ignore_status=True, shell=True)
-        if cmd_result.exit_status:
-            return False
-        return True
+        return self._load_mounts()[0]
+
+    def invalidate_cache(self):
+        """
+        Drop all the cached host info, e.g. after libvirtd gets restarted
+
+        This covers the /proc/mounts info, the cgroup paths, the io scheduler
+        and the device numbers.
+        """
+        self.refresh_mounts()
+        self._is_bfq = None
+        self._devnum_cache.clear()
 
     def get_cgroup_path(self, controller=None):
         """
         Get specific cgroup controller's root path
 
+        The resolved path is cached per controller, use refresh_mounts() or
+        invalidate_cache() to drop the cached paths.
+
         :params controller: The cgroup controller, used for cgroup v1. For
                             cgroup v2 this param will be ignored since all
                             controllers are in the same dir
         :return: The path to the cgroup controller
         """
-        cgroup_path = ""
         if self.is_cgroup_v2_enabled():
+            controller = None
+        cgroup_path = self._cgroup_path_cache.get(controller)
+        if cgroup_path is None:
+            cgroup_path = self.__resolve_cgroup_path(controller)
+            if cgroup_path is not None:
+                self._cgroup_path_cache[controller] = cgroup_path
+        return cgroup_path
+
+    def __resolve_cgroup_path(self, controller=None):
+        """
+        Resolve specific cgroup controller's root path
+
+        :params controller: The cgroup controller, used for cgroup v1
+        :return: The path to the cgroup controller
+        """
+        cgroup_path = ""
+        is_v2, cg_mount_point = self._load_mounts()
+        if is_v2:
             vm_proc_cgroup_path = "/proc/%s/cgroup" % self.__vm_pid
-            with open("/proc/mounts", "r") as mnts:
-                cg_mount_point = re.findall(r"\s(\S*cgroup)\s", mnts.read())
-            with open(vm_proc_cgroup_path, "r") as vm_cg_file:
-                cg_vm_scope = re.findall(r"\S*::(\S*)", vm_cg_file.read())
-            cgroup_path = os.path.join(cg_mount_point[0], cg_vm_scope[0].strip("/"))
+            with open(vm_proc_cgroup_path, "rb") as vm_cg_file:
+                cg_vm_scope = _CG_SCOPE_RE.findall(vm_cg_file.read())
+            cgroup_path = os.path.join(
+                cg_mount_point, cg_vm_scope[0].decode().strip("/")
+            )
             if "emulator" in cgroup_path:
                 cgroup_path += "/.."
         else:
@@ -120,28 +266,78 @@ class CgroupTest(object):
             return None
         return cgroup_path
 
-    def __get_cpu_subdirs(self, controller_path=None, dir_keyword=None):
+    def __get_existing_cgroup_path(self, controller=None):
         """
-        Search and return the sub dirs of the cpu controllers by keyword
+        Get specific cgroup controller's root path, failing if it is missing
+
+        :params controller: The cgroup controller, used for cgroup v1
+        :return: The path to the cgroup controller
+        :raise: exceptions.TestError if the cgroup path doesn't exist
+        """
+        cgroup_path = self.get_cgroup_path(controller)
+        if cgroup_path is None:
+            raise exceptions.TestError(
+                "Failed to get the cgroup path of controller '%s' for vm "
+                "process %s" % (controller, self.__vm_pid)
+            )
+        return cgroup_path
+
+    def __get_first_cpu_subdir(self, controller_path=None, dir_keyword=None):
+        """
+        Search and return the first (in sorted order) sub dir of the cpu
+        controllers by keyword, without building the full sorted list
 
         :param controller_path: The path of the cpu controller
         :param dir_keyword: The keyword of the sub dirs. Normally it could be
                             "vcpu", "emulator", "iothread"
-        :return: The list of the sub dir names
+        :return: The first sub dir name, or None if not found
         """
-        dir_names = []
-        for filename in os.listdir(controller_path):
-            if dir_keyword in filename:
-                dir_names.append(filename)
-        if not dir_names and "iothread" in dir_keyword:
+        with os.scandir(controller_path) as entries:
+            dir_name = min(
+                (entry.name for entry in entries if dir_keyword in entry.name),
+                default=None,
+            )
+        if dir_name is None and "iothread" in dir_keyword:
             LOG.debug(
                 "No sub dirs found with keyword: '%s'. "
                 "Pls check if you've executed virsh cmd "
                 "'iothreadadd'.",
                 dir_keyword,
             )
-            return None
-        return sorted(dir_names)
+        return dir_name
+
+    def __resolve_schedinfo_file_mapping(self, cgroup_path, file_mapping):
+        """
+        Substitute the vcpu/iothread sub dirs into a schedinfo file mapping
+
+        :param cgroup_path: The path of the cpu controller
+        :param file_mapping: The schedinfo file mapping with '<vcpuX>' and
+                             '<iothreadX>' placeholders
+        :return: A dict of the resolved file mapping. Entries using
+                 '<iothreadX>' are dropped if there is no iothread sub dir
+        """
+        vcpu_dir = self.__get_first_cpu_subdir(cgroup_path, "vcpu")
+        iothread_dir = self.__get_first_cpu_subdir(cgroup_path, "iothread")
+        resolved_mapping = {}
+        for cg_key, cg_file_name in file_mapping.items():
+            if "<iothreadX>" in cg_file_name:
+                if not iothread_dir:
+                    continue
+                cg_file_name = cg_file_name.replace("<iothreadX>", iothread_dir)
+            elif "<vcpuX>" in cg_file_name:
+                cg_file_name = cg_file_name.replace("<vcpuX>", vcpu_dir)
+            resolved_mapping[cg_key] = cg_file_name
+        return resolved_mapping
+
+    def __get_cgroup1_blkio_mapping(self):
+        """
+        Get the cgroup v1 blkio file mapping matching the io scheduler in use
+
+        :return: The blkio file mapping for 'bfq' or 'cfq'
+        """
+        if self.is_bfq():
+            return _CGROUP_V1_BLKIO_BFQ
+        return _CGROUP_V1_BLKIO_CFQ
 
     def __get_standardized_cgroup1_info(self, virsh_cmd=None):
         """
@@ -164,83 +360,57 @@ class CgroupTest(object):
             :return: The path to the cgroup param file
             """
             if cg_key in ["weight", "cpu_shares"] and "libvirt" in cg_path:
-                return os.path.join(cg_path.split("libvirt")[0], cg_file_name)
-            return os.path.join(cg_path, cg_file_name)
+                return f"{cg_path.split('libvirt')[0].rstrip('/')}/{cg_file_name}"
+            return f"{cg_path}/{cg_file_name}"
 
         standardized_cgroup_info = {}
         if virsh_cmd == "blkiotune":
-            cgroup_path = self.get_cgroup_path("blkio")
+            cgroup_path = self.__get_existing_cgroup_path("blkio")
             dev_init_dict = {
                 "rbps": "max",
                 "wbps": "max",
                 "riops": "max",
                 "wiops": "max",
             }
-            dev_list = []
-            if not self.is_bfq():
-                CGROUP_V1_BLKIO_FILE_MAPPING["weight"] = "blkio.weight"
-                CGROUP_V1_BLKIO_FILE_MAPPING["weight_device"] = "blkio.weight_device"
-            for cg_key, cg_file_name in list(CGROUP_V1_BLKIO_FILE_MAPPING.items()):
+            for cg_key, cg_file_name in self.__get_cgroup1_blkio_mapping().items():
                 cg_file_path = __get_cg_file_path(cg_key, cgroup_path, cg_file_name)
-                with open(cg_file_path, "r") as cg_file:
-                    if cg_key in ["weight"]:
-                        standardized_cgroup_info[cg_key] = cg_file.read().strip()
-                    if cg_key in ["rbps", "wbps", "riops", "wiops", "weight_device"]:
-                        for line in cg_file.readlines():
-                            dev_info = line.strip().split()
-                            dev_num = dev_info[0]
-                            dev_cg_value = dev_info[1]
-                            if dev_num not in dev_list:
-                                standardized_cgroup_info[dev_num] = dev_init_dict.copy()
-                            standardized_cgroup_info[dev_num][cg_key] = dev_cg_value
-                            dev_list.append(dev_num)
+                cg_file_value = _read_cgroup_file(cg_file_path)
+                if cg_key in ["weight"]:
+                    standardized_cgroup_info[cg_key] = cg_file_value.strip().decode()
+                if cg_key in ["rbps", "wbps", "riops", "wiops", "weight_device"]:
+                    for line in cg_file_value.decode().splitlines():
+                        dev_num, dev_cg_value = line.split()[:2]
+                        dev_entry = standardized_cgroup_info.setdefault(
+                            dev_num, dev_init_dict.copy()
+                        )
+                        dev_entry[cg_key] = dev_cg_value
         elif virsh_cmd == "memtune":
-            cgroup_path = self.get_cgroup_path("memory")
-            cmd = "getconf PAGE_SIZE"
-            page_size = process.run(
-                cmd, ignore_status=True, shell=True
-            ).stdout_text.strip()
-            LOG.debug("page_size is %d" % int(page_size))
-            if int(page_size) == 65536:
-                max_mem_value = "9223372036854710272"
-            else:
-                max_mem_value = "9223372036854771712"
+            cgroup_path = self.__get_existing_cgroup_path("memory")
+            max_mem_value = _MAX_MEM_VALUE
+            LOG.debug("page_size is %d" % _PAGE_SIZE)
             LOG.debug("max_mem_value is %s" % max_mem_value)
-            for cg_key, cg_file_name in list(CGROUP_V1_MEM_FILE_MAPPING.items()):
-                with open(os.path.join(cgroup_path, cg_file_name), "r") as cg_file:
-                    cg_file_value = cg_file.read().strip()
-                    if cg_file_value == max_mem_value:
-                        cg_file_value = "max"
-                    standardized_cgroup_info[cg_key] = cg_file_value
+            for cg_key, cg_file_name in CGROUP_V1_MEM_FILE_MAPPING.items():
+                cg_file_path = f"{cgroup_path}/{cg_file_name}"
+                cg_file_value = _read_cgroup_file(cg_file_path).strip().decode()
+                if cg_file_value == max_mem_value:
+                    cg_file_value = "max"
+                standardized_cgroup_info[cg_key] = cg_file_value
         elif virsh_cmd == "schedinfo":
-            cgroup_path = self.get_cgroup_path("cpu,cpuacct") + "/.."
+            cgroup_path = self.__get_existing_cgroup_path("cpu,cpuacct") + "/.."
             max_cpu_value = "-1"
-            vcpu_dirs = self.__get_cpu_subdirs(cgroup_path, "vcpu")
-            iothread_dirs = self.__get_cpu_subdirs(cgroup_path, "iothread")
-            for cg_key, cg_file_name in list(CGROUP_V1_SCHEDINFO_FILE_MAPPING.items()):
-                if "<vcpuX>" in cg_file_name:
-                    cg_file_name = cg_file_name.replace("<vcpuX>", vcpu_dirs[0])
-                if "<iothreadX>" in cg_file_name:
-                    if iothread_dirs:
-                        cg_file_name = cg_file_name.replace(
-                            "<iothreadX>", iothread_dirs[0]
-                        )
-                    else:
-                        continue
+            schedinfo_file_mapping = self.__resolve_schedinfo_file_mapping(
+                cgroup_path, CGROUP_V1_SCHEDINFO_FILE_MAPPING
+            )
+            for cg_key, cg_file_name in schedinfo_file_mapping.items():
                 cg_file_path = __get_cg_file_path(cg_key, cgroup_path, cg_file_name)
-                with open(cg_file_path, "r") as cg_file:
-                    cg_file_value = cg_file.read().strip()
-                    if cg_file_value == max_cpu_value:
-                        cg_file_value = "max"
-                    if "quota" in cg_key:
-                        if cg_file_value in [
-                            "-1",
-                            "18446744073709551",
-                            "17592186044415",
-                        ]:
-                            standardized_cgroup_info[cg_key] = "max"
-                            continue
-                    standardized_cgroup_info[cg_key] = cg_file_value
+                cg_file_value = _read_cgroup_file(cg_file_path).strip().decode()
+                if cg_file_value == max_cpu_value:
+                    cg_file_value = "max"
+                if "quota" in cg_key:
+                    if cg_file_value in _MAX_QUOTA_VALUES:
+                        standardized_cgroup_info[cg_key] = "max"
+                        continue
+                standardized_cgroup_info[cg_key] = cg_file_value
         else:
             LOG.error("You've provided a wrong virsh cmd: %s", virsh_cmd)
         return standardized_cgroup_info
@@ -256,56 +426,43 @@ class CgroupTest(object):
         :return: A dict containing the cgroup info
         """
         standardized_cgroup_info = {}
-        cgroup_path = self.get_cgroup_path()
+        cgroup_path = self.__get_existing_cgroup_path()
         if virsh_cmd == "blkiotune":
             weight_file_name = CGROUP_V2_BLKIO_FILE_MAPPING["weight"]
             iomax_file_name = CGROUP_V2_BLKIO_FILE_MAPPING["wiops"]
-            path_to_weight = os.path.join(
-                cgroup_path.split("libvirt")[0], weight_file_name
-            )
-            with open(path_to_weight, "r") as weight_file:
-                weight_value = re.search(r"\d+", weight_file.read())
-                if weight_value:
-                    weight_value = weight_value.group()
-                standardized_cgroup_info["weight"] = weight_value
-            path_to_iomax = os.path.join(cgroup_path, iomax_file_name)
-            with open(path_to_iomax, "r") as iomax_file:
-                iomax_info = iomax_file.readlines()
-                for line in iomax_info:
-                    dev_iomax_info = line.strip().split()
-                    dev_iomax_dict = {}
-                    dev_num = dev_iomax_info[0]
-                    for i in range(1, len(dev_iomax_info)):
-                        key, value = dev_iomax_info[i].split("=")
-                        dev_iomax_dict[key] = value
-                    standardized_cgroup_info[dev_num] = dev_iomax_dict
+            weight_dir = cgroup_path.split("libvirt")[0].rstrip("/")
+            path_to_weight = f"{weight_dir}/{weight_file_name}"
+            weight_value = _DIGITS_RE.search(_read_cgroup_file(path_to_weight))
+            if weight_value:
+                weight_value = weight_value.group().decode()
+            standardized_cgroup_info["weight"] = weight_value
+            path_to_iomax = f"{cgroup_path}/{iomax_file_name}"
+            for line in _read_cgroup_file(path_to_iomax).decode().splitlines():
+                dev_iomax_info = line.split()
+                dev_iomax_dict = {}
+                dev_num = dev_iomax_info[0]
+                for i in range(1, len(dev_iomax_info)):
+                    key, value = dev_iomax_info[i].split("=")
+                    dev_iomax_dict[key] = value
+                standardized_cgroup_info[dev_num] = dev_iomax_dict
         elif virsh_cmd == "memtune":
-            for cg_key, cg_file_name in list(CGROUP_V2_MEM_FILE_MAPPING.items()):
-                with open(os.path.join(cgroup_path, cg_file_name), "r") as cg_file:
-                    cg_file_value = cg_file.read().strip()
-                    standardized_cgroup_info[cg_key] = cg_file_value
+            for cg_key, cg_file_name in CGROUP_V2_MEM_FILE_MAPPING.items():
+                cg_file_path = f"{cgroup_path}/{cg_file_name}"
+                cg_file_value = _read_cgroup_file(cg_file_path).strip().decode()
+                standardized_cgroup_info[cg_key] = cg_file_value
         elif virsh_cmd == "schedinfo":
-            vcpu_dirs = self.__get_cpu_subdirs(cgroup_path, "vcpu")
-            iothread_dirs = self.__get_cpu_subdirs(cgroup_path, "iothread")
-            for cg_key, cg_file_name in list(CGROUP_V2_SCHEDINFO_FILE_MAPPING.items()):
-                if "<vcpuX>" in cg_file_name:
-                    cg_file_name = cg_file_name.replace("<vcpuX>", vcpu_dirs[0])
-                if "<iothreadX>" in cg_file_name:
-                    if iothread_dirs:
-                        cg_file_name = cg_file_name.replace(
-                            "<iothreadX>", iothread_dirs[0]
-                        )
-                    else:
-                        continue
+            schedinfo_file_mapping = self.__resolve_schedinfo_file_mapping(
+                cgroup_path, CGROUP_V2_SCHEDINFO_FILE_MAPPING
+            )
+            for cg_key, cg_file_name in schedinfo_file_mapping.items():
                 cg_dir = cgroup_path
                 if cg_key == "cpu_shares":
-                    cg_dir = cgroup_path.split("libvirt")[0]
-                with open(os.path.join(cg_dir, cg_file_name), "r") as cg_file:
-                    list_index = 0
-                    cg_file_values = cg_file.read().strip().split()
-                    if "period" in cg_key:
-                        list_index = 1
-                    standardized_cgroup_info[cg_key] = cg_file_values[list_index]
+                    cg_dir = cgroup_path.split("libvirt")[0].rstrip("/")
+                cg_file_values = _read_cgroup_file(f"{cg_dir}/{cg_file_name}").split()
+                list_index = 0
+                if "period" in cg_key:
+                    list_index = 1
+                standardized_cgroup_info[cg_key] = cg_file_values[list_index].decode()
         else:
             LOG.error("You've provided a wrong virsh cmd: %s", virsh_cmd)
         return standardized_cgroup_info
@@ -314,24 +471,18 @@ class CgroupTest(object):
         """
         Get the cgroup file mapping
 
+        For 'blkiotune' on cgroup v1 the mapping depends on the io scheduler,
+        so this looks up the first disk and reads its scheduler file via
+        is_bfq() (cached on the instance).
+
         :param virsh_cmd: The virsh cmd used. This is to judge which cgroup
                           info to get
         :return: A dict of file mapping
         """
-        if self.is_cgroup_v2_enabled():
-            if virsh_cmd == "memtune":
-                return CGROUP_V2_MEM_FILE_MAPPING
-            elif virsh_cmd == "blkiotune":
-                return CGROUP_V2_BLKIO_FILE_MAPPING
-            elif virsh_cmd == "schedinfo":
-                return CGROUP_V2_SCHEDINFO_FILE_MAPPING
-        else:
-            if virsh_cmd == "memtune":
-                return CGROUP_V1_MEM_FILE_MAPPING
-            elif virsh_cmd == "blkiotune":
-                return CGROUP_V1_BLKIO_FILE_MAPPING
-            elif virsh_cmd == "schedinfo":
-                return CGROUP_V1_SCHEDINFO_FILE_MAPPING
+        is_v2 = self.is_cgroup_v2_enabled()
+        if not is_v2 and virsh_cmd == "blkiotune":
+            return self.__get_cgroup1_blkio_mapping()
+        return _FILE_MAPPINGS[is_v2].get(virsh_cmd)
 
     def get_standardized_cgroup_info(self, virsh_cmd=None):
         """
@@ -342,10 +493,7 @@ class CgroupTest(object):
                           the blkio related cgroup info will be returned
         :return: A dict containing the cgroup info
         """
-        if self.is_cgroup_v2_enabled():
-            return self.__get_standardized_cgroup2_info(virsh_cmd)
-        else:
-            return self.__get_standardized_cgroup1_info(virsh_cmd)
+        return self._standardizers[self.is_cgroup_v2_enabled()](virsh_cmd)
 
     def get_virsh_output_dict(self, vm_name=None, virsh_cmd=None):
         """
@@ -356,13 +504,8 @@ class CgroupTest(object):
 
         :return: The virsh cmd output, as a dict
         """
-        if virsh_cmd == "memtune":
-            func = virsh.memtune_list
-        elif virsh_cmd == "blkiotune":
-            func = virsh.blkiotune
-        elif virsh_cmd == "schedinfo":
-            func = virsh.schedinfo
-        else:
+        func = _VIRSH_FUNCS.get(virsh_cmd)
+        if func is None:
             LOG.error("There is no virsh cmd '%s'", virsh_cmd)
             return None
         result = func(vm_name, ignore_status=True)
@@ -380,17 +523,11 @@ class CgroupTest(object):
         :return: The virsh cmd output, as a dict.
         """
         output = result.stdout_text.strip()
-        output_list = output.splitlines()
-        output_dict = {}
-        for output_line in output_list:
-            output_info = output_line.split(":")
-            output_param = output_info[0].strip()
-            if len(output_info) == 1:
-                output_value = ""
-            else:
-                output_value = output_info[1].strip()
-            output_dict[output_param] = output_value
-        return output_dict
+        return {
+            output_param.strip(): output_value.strip()
+            for output_line in output.splitlines()
+            for output_param, _, output_value in [output_line.partition(":")]
+        }
 
     def __get_dev_major_minor(self, dev_path="/dev/sda"):
         """
@@ -398,11 +535,15 @@ class CgroupTest(object):
 
         :param dev_path: The path to the device
         """
+        if dev_path in self._devnum_cache:
+            return self._devnum_cache[dev_path]
         if not os.path.exists(dev_path):
             LOG.debug("device '%s' not existing", dev_path)
             return None
         dev = os.stat(dev_path)
-        return "%s:%s" % (os.major(dev.st_rdev), os.minor(dev.st_rdev))
+        dev_num = "%s:%s" % (os.major(dev.st_rdev), os.minor(dev.st_rdev))
+        self._devnum_cache[dev_path] = dev_num
+        return dev_num
 
     def get_standardized_virsh_info(self, virsh_cmd=None, virsh_dict=None):
         """
@@ -414,38 +555,34 @@ class CgroupTest(object):
         """
         standardized_virsh_output_info = {}
         if virsh_cmd == "blkiotune":
-            virsh_output_mapping = VIRSH_BLKIOTUNE_OUTPUT_MAPPING.copy()
-            dev_list = []
+            virsh_output_mapping = VIRSH_BLKIOTUNE_OUTPUT_MAPPING
             dev_init_dict = {
                 "rbps": "max",
                 "wbps": "max",
                 "riops": "max",
                 "wiops": "max",
             }
-            for io_item, io_item_value in list(virsh_dict.items()):
+            for io_item, io_item_value in virsh_dict.items():
                 if io_item in ["weight"]:
                     standardized_virsh_output_info[io_item] = io_item_value
-                elif io_item in list(virsh_output_mapping.keys()) and io_item_value:
+                elif io_item in virsh_output_mapping and io_item_value:
+                    io_key = virsh_output_mapping[io_item]
                     io_value_list = io_item_value.split(",")
                     for i in range(len(io_value_list)):
                         if "dev" in io_value_list[i]:
                             dev_num = self.__get_dev_major_minor(io_value_list[i])
-                            if dev_num not in dev_list:
-                                standardized_virsh_output_info[dev_num] = (
-                                    dev_init_dict.copy()
-                                )
-                                dev_list.append(dev_num)
-                            standardized_virsh_output_info[dev_num][
-                                virsh_output_mapping[io_item]
-                            ] = io_value_list[i + 1]
+                            dev_entry = standardized_virsh_output_info.setdefault(
+                                dev_num, dev_init_dict.copy()
+                            )
+                            dev_entry[io_key] = io_value_list[i + 1]
         elif virsh_cmd == "memtune":
             standardized_virsh_output_info = {
                 "hard_limit": "max",
                 "soft_limit": "max",
                 "swap_hard_limit": "max",
             }
-            for mem_item, mem_item_value in list(virsh_dict.items()):
-                if mem_item_value in ["unlimited"]:
+            for mem_item, mem_item_value in virsh_dict.items():
+                if mem_item_value in _UNLIMITED_MEM:
                     standardized_virsh_output_info[mem_item] = "max"
                 elif mem_item_value.isdigit():
                     standardized_virsh_output_info[mem_item] = str(
@@ -459,15 +596,12 @@ class CgroupTest(object):
                         mem_item,
                     )
         elif virsh_cmd == "schedinfo":
-            for schedinfo_item, schedinfo_value in list(virsh_dict.items()):
+            for schedinfo_item, schedinfo_value in virsh_dict.items():
                 if schedinfo_item.lower() in ["scheduler"]:
                     # no need to check scheduler type, it's fixed for qemu
                     continue
                 if "quota" in schedinfo_item:
-                    if (
-                        schedinfo_value in ["18446744073709551", "17592186044415"]
-                        or int(schedinfo_value) < 0
-                    ):
+                    if schedinfo_value in _MAX_QUOTA_VALUES or int(schedinfo_value) < 0:
                         # When set cfs_quota values with negative values or
                         # maximum acceptable values, it's means 'max' or
                         # 'unlimited', so match these values to 'max'.
@@ -483,16 +617,17 @@ class CgroupTest(object):
         """
         Judge which scheduler is used, 'bfq' or 'cfq'
 
+        The result is cached on the instance since the io scheduler is not
+        expected to change during a test.
+
         :return: bool, True if bfq is used, False if cfq is used
         """
-
-        first_blk = utils_disk.get_first_disk()
-        schedulerfd = "/sys/block/%s/queue/scheduler" % first_blk
-        bfq_scheduler = False
-        with open(schedulerfd, "r") as iosche:
-            if "bfq" in iosche.readline():
-                bfq_scheduler = True
-        return bfq_scheduler
+        if self._is_bfq is None:
+            first_blk = utils_disk.get_first_disk()
+            schedulerfd = "/sys/block/%s/queue/scheduler" % first_blk
+            with open(schedulerfd, "rb") as iosche:
+                self._is_bfq = b"bfq" in iosche.read()
+        return self._is_bfq
 
     def get_standardized_virsh_output_by_name(self, vm_name=None, virsh_cmd=None):
         """
@@ -536,8 +671,8 @@ class CgroupTest(object):
         cpuset_path = "/sys/fs/cgroup/cpuset/machine.slice/cpuset.cpus"
         self._produce_cpuset_cpus_file(cpuset_path, vm_name)
         LOG.debug("Set %s to %s", cpuset_path, value)
-        cmd = "echo %s > %s" % (value, cpuset_path)
-        process.run(cmd, ignore_status=False, shell=True)
+        with open(cpuset_path, "w") as cpuset_file:
+            cpuset_file.write("%s" % value)
 
     def get_cpuset_cpus(self, vm_name):
         """
@@ -552,5 +687,5 @@ class CgroupTest(object):
         cpuset_path = "/sys/fs/cgroup/cpuset/machine.slice/cpuset.cpus"
         self._produce_cpuset_cpus_file(cpuset_path, vm_name)
         LOG.debug("Get %s value", cpuset_path)
-        cmd = "cat %s" % cpuset_path
-        return process.run(cmd, ignore_status=False, shell=True).stdout_text.strip()
+        with open(cpuset_path, "r") as cpuset_file:
+            return cpuset_file.read().strip()